@@ -1,102 +1,402 @@
 import os
 import re
+import mmap
+import functools
 import webbrowser
 import subprocess
 import platform
-from pathlib import Path
-from collections import defaultdict, deque
+from contextlib import nullcontext
+from dataclasses import dataclass
+from collections import defaultdict
+
+@dataclass(slots=True)
+class SourceFile:
+    """A .cs file read once and shared by every analysis pass"""
+    path: str
+    relative_path: str
+    content: str  # Empty unless loaded with_content
+    lines: list
+    namespace: str | None
+    usings: tuple  # ((target_namespace, line_number), ...)
+    custom_usings: frozenset
+
+_NAMESPACE_RE = re.compile(r'(?m)^namespace\s+([\w.]+)')
+_USING_RE = re.compile(r'(?m)^\s*using\s+([\w.]+);')
+_DOTTED_NAME_RE = re.compile(r'[\w.]+')
+
+# Byte twins run directly on the memory-mapped file. Bytes \w is ASCII-only, so every
+# non-ASCII byte is accepted as well and the decoded name is trimmed back to str \w
+_NAMESPACE_BYTES_RE = re.compile(rb'(?m)^namespace\s+([\w.\x80-\xff]+)')
+_USING_BYTES_RE = re.compile(rb'(?m)^\s*using\s+([\w.\x80-\xff]+);')
+
+# Class/struct declarations; access and other modifiers do not affect the captured name
+_CLASS_OR_STRUCT_RE = re.compile(r'(?:class|struct)\s+(\w+)')
+_ENCLOSING_DECL_RE = re.compile(r'\b(?:class|struct)\s+\w+')
+_IDENTIFIER_RE = re.compile(r'\w+')
+# A declaration that opens a scope: the name is followed by whitespace, ':', '<' or '{'.
+# Zero-width, so a name that itself ends in "class" cannot hide the next declaration
+_SCOPE_DECL_RE = re.compile(r'(?=(?:class|struct)\s+(\w+)[\s:<{])')
+# System declarations: a name containing "System", or any type implementing ISystem.
+# Each pattern scans the file on its own, since a greedy '.*ISystem' can swallow a later
+# declaration on the same line
+_SYSTEM_DECL_PATTERNS = (
+    re.compile(r'(?:struct|class)\s+(\w*System\w*)(?:\s*:|\s+implements|\s*\{)'),
+    re.compile(r'(?:struct|class)\s+(\w+)\s*:\s*.*ISystem'),
+    re.compile(r'struct\s+(\w+)\s*:\s*.*ISystem'),
+)
+
+# Usage patterns with their descriptions; {cls} is replaced by the escaped class name
+CLASS_PATTERN_TEMPLATES = (
+    (r':\s*{cls}', "inheritance"),
+    (r':\s*.*,\s*{cls}', "interface implementation"),
+    (r'(?:public|private|protected|internal)\s+{cls}\s+\w+', "field declaration"),
+    (r'(?:public|private|protected|internal)\s+.*{cls}\s+\w+', "field declaration"),
+    (r'<{cls}>', "generic type parameter"),
+    (r'RefRW<{cls}>', "ECS component reference (RefRW)"),
+    (r'RefRO<{cls}>', "ECS component reference (RefRO)"),
+    (r'SystemAPI\..*<.*{cls}.*>', "SystemAPI call"),
+    (r'new\s+{cls}\s*[\(\{{]', "object instantiation"),
+    (r'{cls}\.\w+', "static member access"),
+    (r'GetComponent<{cls}>', "GetComponent call"),
+    (r'HasComponent<{cls}>', "HasComponent call"),
+    (r'AddComponent\([^,]*,\s*new\s+{cls}(?!\w)\s*\(', "AddComponent call"),
+    (r'typeof\({cls}\)', "typeof reference"),
+    (r'\[UpdateBefore\(typeof\({cls}\)\)\]', "UpdateBefore dependency"),
+    (r'\[UpdateAfter\(typeof\({cls}\)\)\]', "UpdateAfter dependency"),
+    (r'UpdateBefore.*{cls}', "UpdateBefore dependency"),
+    (r'UpdateAfter.*{cls}', "UpdateAfter dependency"),
+    (r'\b{cls}\b.*\s+\w+\s*[\(;]', "method parameter/variable"),
+    (r'\b{cls}\b', "general reference"),
+)
+
+SYSTEM_PATTERN_TEMPLATES = (
+    (r'\[UpdateBefore\(typeof\({cls}\)\)\]', "UpdateBefore dependency"),
+    (r'\[UpdateAfter\(typeof\({cls}\)\)\]', "UpdateAfter dependency"),
+    (r'UpdateBefore.*{cls}', "UpdateBefore dependency"),
+    (r'UpdateAfter.*{cls}', "UpdateAfter dependency"),
+    (r'SystemAPI\.GetSingleton<{cls}>', "SystemAPI singleton access"),
+    (r'World\.GetOrCreateSystem<{cls}>', "system reference"),
+    (r'typeof\({cls}\)', "typeof reference"),
+    (r'\b{cls}\b.*\s+\w+\s*[;=]', "variable/field reference"),
+    (r'\b{cls}\b', "general reference"),
+)
+
+# Usages that count even when both classes live in the same file
+LEGITIMATE_USAGE_TEMPLATES = (
+    (r'new\s+{cls}\s*[\(\{{]', "object instantiation"),
+    (r':\s*{cls}', "inheritance"),
+    (r'<{cls}>', "generic parameter"),
+    (r'AddComponent\([^,]*,\s*new\s+{cls}', "AddComponent"),
+    (r'typeof\({cls}\)', "typeof reference"),
+    (r'(?:public|private|protected|internal)\s+{cls}\s+\w+', "field declaration"),
+    (r'{cls}\.\w+', "static member access"),
+)
+
+@functools.lru_cache(maxsize=None)
+def _compiled_patterns_for(cls_name, templates=CLASS_PATTERN_TEMPLATES):
+    """Compile a pattern template table for one class name, once per process"""
+    escaped = re.escape(cls_name)
+    return [(re.compile(template.format(cls=escaped)), description)
+            for template, description in templates]
+
+def _match_lines_containing(patterns, text, needle, first_line=1):
+    """Yield (line_number, description) for each line of text that contains needle and matches a pattern
+    
+    Only lines containing needle are searched, and the first matching pattern wins.
+    """
+    line_num, counted = first_line, 0
+    pos = text.find(needle)
+    while pos != -1:
+        line_start = text.rfind('\n', 0, pos) + 1
+        line_end = text.find('\n', pos)
+        if line_end == -1:
+            line_end = len(text)
+        for pattern, description in patterns:
+            if pattern.search(text, line_start, line_end):
+                line_num += text.count('\n', counted, line_start)
+                counted = line_start
+                yield line_num, description
+                break
+        pos = text.find(needle, line_end)
+
+# Below this many names, plain substring checks are faster than the identifier index
+NAME_FINDER_MIN_NAMES = 100
+
+def _build_name_finder(names):
+    """Build find(text), returning the subset of names that occur in text as substrings
+    
+    Does the job of an Aho-Corasick automaton with the standard library: names
+    are identifiers, so every occurrence lies inside a single \\w+ run, and the
+    names contained in each distinct run are worked out once and memoised. Cost
+    per text is one pass over its identifiers, independent of len(names).
+    """
+    names = frozenset(names)
+    if len(names) < NAME_FINDER_MIN_NAMES:
+        # A few C-level substring searches beat tokenizing the text
+        return lambda text: {name for name in names if name in text}
+    
+    lengths = sorted({len(name) for name in names})
+    names_in_token = {}
+    
+    def names_in(token):
+        found = []
+        for length in lengths:
+            if length > len(token):
+                break
+            for start in range(len(token) - length + 1):
+                if token[start:start + length] in names:
+                    found.append(token[start:start + length])
+        return found
+    
+    def find(text):
+        found = set()
+        for token in set(_IDENTIFIER_RE.findall(text)):
+            if token not in names_in_token:
+                names_in_token[token] = names_in(token)
+            found.update(names_in_token[token])
+        return found
+    
+    return find
+
+# (script_path, with_content) -> [SourceFile], so each file is read and split exactly once
+_source_cache = {}
+
+def _iter_cs_files(root):
+    """Yield the path of every .cs file under root, walking directories with os.scandir
+    
+    Files come out in the same depth-first order as Path.rglob, so when two files
+    declare the same class name the same one is read last.
+    """
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue  # Missing or unreadable directory
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            # normcase folds case on Windows, where rglob matched '.CS' as well
+            elif os.path.normcase(entry.name).endswith('.cs') and entry.is_file():
+                yield entry.path
+        pending.extend(reversed(subdirectories))
+
+def _find_namespace_and_usings(data, namespace_re, using_re, newline):
+    """Return the namespace match and [(using_match, line_number), ...] for str or bytes data"""
+    usings = []
+    line_num, pos = 1, 0
+    for using_match in using_re.finditer(data):
+        line_num += data[pos:using_match.end()].count(newline)
+        pos = using_match.end()
+        usings.append((using_match, line_num))
+    return namespace_re.search(data), usings
+
+def _decode_name(raw):
+    """Decode a name captured by a byte pattern, trimmed to the characters str patterns accept"""
+    match = _DOTTED_NAME_RE.match(raw.decode('utf-8'))
+    return match.group() if match else None
+
+def _parse_file(cs_file, script_path, with_content=True):
+    """Read one .cs file and precompute its metadata"""
+    if with_content:
+        with open(cs_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        namespace_match, using_matches = _find_namespace_and_usings(
+            content, _NAMESPACE_RE, _USING_RE, '\n')
+        namespace = namespace_match.group(1) if namespace_match else None
+        usings = [(match.group(1), line_num) for match, line_num in using_matches]
+    else:
+        # Only the header statements are needed, so scan the mapped bytes without decoding
+        content = ""
+        with open(cs_file, 'rb') as f:
+            # mmap refuses empty files
+            mapped = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                      if os.fstat(f.fileno()).st_size else nullcontext(b''))
+            with mapped as data:
+                namespace_match, using_matches = _find_namespace_and_usings(
+                    data, _NAMESPACE_BYTES_RE, _USING_BYTES_RE, b'\n')
+                namespace = _decode_name(namespace_match.group(1)) if namespace_match else None
+                usings = []
+                for match, line_num in using_matches:
+                    target = match.group(1).decode('utf-8')
+                    # A non-word character before the ';' means the str pattern would not match
+                    if _DOTTED_NAME_RE.fullmatch(target):
+                        usings.append((target, line_num))
+    
+    return SourceFile(
+        path=cs_file,
+        relative_path=os.path.relpath(cs_file, script_path),
+        content=content,
+        lines=content.split('\n') if with_content else [],
+        namespace=namespace,
+        usings=tuple(usings),
+        custom_usings=frozenset(u for u, _ in usings
+                                if not u.startswith(('System', 'Unity', 'UnityEngine'))),
+    )
+
+def _load_sources(script_path, with_content=True):
+    """Read every .cs file under script_path once and precompute per-file metadata
+    
+    Without with_content only the namespace and using statements are extracted,
+    and the file text is never decoded.
+    """
+    for key in ((script_path, True), (script_path, with_content)):
+        if key in _source_cache:
+            return _source_cache[key]
+    
+    sources = [_parse_file(cs_file, script_path, with_content)
+               for cs_file in _iter_cs_files(script_path)]
+    
+    _source_cache[(script_path, with_content)] = sources
+    return sources
+
+def _copy_to_windows_clipboard(text):
+    """Put text on the Windows clipboard through user32 without spawning clip.exe"""
+    import ctypes
+    from ctypes import wintypes
+    
+    CF_UNICODETEXT = 13
+    GMEM_MOVEABLE = 0x0002
+    
+    user32 = ctypes.windll.user32
+    kernel32 = ctypes.windll.kernel32
+    # Declare handle-sized return types, otherwise they are truncated on 64-bit
+    kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
+    kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+    kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalLock.restype = wintypes.LPVOID
+    kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalFree.argtypes = [wintypes.HGLOBAL]
+    user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+    user32.SetClipboardData.restype = wintypes.HANDLE
+    
+    # Fill the buffer before touching the clipboard, so a failure leaves its contents intact
+    data = text.encode('utf-16-le') + b'\x00\x00'
+    handle = kernel32.GlobalAlloc(GMEM_MOVEABLE, len(data))
+    if not handle:
+        return False
+    buffer = kernel32.GlobalLock(handle)
+    if not buffer:
+        kernel32.GlobalFree(handle)
+        return False
+    ctypes.memmove(buffer, data, len(data))
+    kernel32.GlobalUnlock(handle)
+    
+    if not user32.OpenClipboard(None):
+        kernel32.GlobalFree(handle)
+        return False
+    try:
+        user32.EmptyClipboard()
+        # On success the clipboard owns the memory; otherwise it is still ours to free
+        if not user32.SetClipboardData(CF_UNICODETEXT, handle):
+            kernel32.GlobalFree(handle)
+            return False
+    finally:
+        user32.CloseClipboard()
+    return True
 
 def copy_to_clipboard(text):
     """Copy text to clipboard based on the operating system"""
     system = platform.system()
     
-    if system == "Darwin":  # macOS
-        process = subprocess.Popen(['pbcopy'], stdin=subprocess.PIPE)
-        process.communicate(text.encode('utf-8'))
-    elif system == "Windows":
-        subprocess.run(['clip'], input=text, text=True, shell=True)
-    elif system == "Linux":
-        subprocess.run(['xclip', '-selection', 'clipboard'], input=text, text=True)
-    else:
-        print("Unsupported operating system for clipboard access")
+    try:
+        if system == "Darwin":  # macOS
+            subprocess.run(['pbcopy'], input=text.encode('utf-8'), check=True)
+        elif system == "Windows":
+            return _copy_to_windows_clipboard(text)
+        elif system == "Linux":
+            subprocess.run(['xclip', '-selection', 'clipboard'], input=text, text=True, check=True)
+        else:
+            print("Unsupported operating system for clipboard access")
+            return False
+    except (OSError, subprocess.CalledProcessError):
+        # Clipboard tool missing or failed - the caller prints the content instead
         return False
     return True
 
-def find_circular_dependencies(dependencies):
-    """Find circular dependencies using DFS"""
-    circular_deps = set()
-    circular_nodes = set()
-    visited = set()
-    rec_stack = set()
-    
-    def dfs(node, path):
-        if node in rec_stack:
-            # Found a cycle - add all edges in the cycle
-            try:
-                cycle_start = path.index(node)
-                cycle = path[cycle_start:] + [node]
-                for i in range(len(cycle) - 1):
-                    circular_deps.add((cycle[i], cycle[i + 1]))
-                    circular_nodes.add(cycle[i])
-                    circular_nodes.add(cycle[i + 1])
-            except ValueError:
-                # Node not in path, just add the direct edge
-                if path:
-                    circular_deps.add((path[-1], node))
-                    circular_nodes.add(path[-1])
-                    circular_nodes.add(node)
-            return True
+def _tarjan_scc(dependencies):
+    """Map every node to the id of its strongly connected component (iterative Tarjan)"""
+    # Relabel nodes to 0..n-1 so the hot loop works on flat lists instead of dicts
+    node_ids = {}
+    for node, targets in dependencies.items():
+        node_ids.setdefault(node, len(node_ids))
+        for target in targets:
+            node_ids.setdefault(target, len(node_ids))
+    
+    n = len(node_ids)
+    adjacency = [[] for _ in range(n)]
+    for node, targets in dependencies.items():
+        adjacency[node_ids[node]].extend(node_ids[target] for target in targets)
+    
+    index = [-1] * n
+    lowlink = [0] * n
+    on_stack = [False] * n
+    scc_id = [-1] * n
+    scc_stack = []
+    next_index = 0
+    next_scc = 0
+    
+    for root in range(n):
+        if index[root] != -1:
+            continue
         
-        if node in visited:
-            return False
-            
-        visited.add(node)
-        rec_stack.add(node)
+        index[root] = lowlink[root] = next_index
+        next_index += 1
+        scc_stack.append(root)
+        on_stack[root] = True
+        # Explicit call stack of (node, iterator over its remaining neighbors)
+        call_stack = [(root, iter(adjacency[root]))]
         
-        for neighbor in dependencies.get(node, []):
-            if dfs(neighbor, path + [node]):
-                return True
-                
-        rec_stack.remove(node)
-        return False
-    
-    for node in dependencies:
-        if node not in visited:
-            dfs(node, [])
-    
-    # Only add edges that can actually reach back to themselves (true cycles)
-    def is_edge_truly_circular(from_node, to_node):
-        """Check if this specific edge is part of a circular path"""
-        # Start from to_node and see if we can reach from_node
-        visited_for_path = set()
-        
-        def can_reach_back(current, target):
-            if current == target:
-                return True
-            if current in visited_for_path:
-                return False
-            visited_for_path.add(current)
+        while call_stack:
+            node, neighbors = call_stack[-1]
             
-            for neighbor in dependencies.get(current, []):
-                if can_reach_back(neighbor, target):
-                    return True
-            return False
-        
-        return can_reach_back(to_node, from_node)
+            for neighbor in neighbors:
+                if index[neighbor] == -1:
+                    index[neighbor] = lowlink[neighbor] = next_index
+                    next_index += 1
+                    scc_stack.append(neighbor)
+                    on_stack[neighbor] = True
+                    call_stack.append((neighbor, iter(adjacency[neighbor])))
+                    break
+                if on_stack[neighbor] and index[neighbor] < lowlink[node]:
+                    lowlink[node] = index[neighbor]
+            else:
+                # All neighbors visited - close the component if node is its root
+                call_stack.pop()
+                if lowlink[node] == index[node]:
+                    while True:
+                        member = scc_stack.pop()
+                        on_stack[member] = False
+                        scc_id[member] = next_scc
+                        if member == node:
+                            break
+                    next_scc += 1
+            
+                if call_stack:
+                    parent = call_stack[-1][0]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
     
-    # Only add edges that are truly circular
-    truly_circular_deps = set()
-    for from_node, to_node in circular_deps:
-        if is_edge_truly_circular(from_node, to_node):
-            truly_circular_deps.add((from_node, to_node))
+    return {node: scc_id[i] for node, i in node_ids.items()}
+
+def find_circular_dependencies(dependencies):
+    """Find circular dependencies using strongly connected components"""
+    # An edge is part of a cycle exactly when both ends share a component
+    scc_id = _tarjan_scc(dependencies)
     
-    circular_deps = truly_circular_deps
+    circular_deps = set()
+    for from_node, targets in dependencies.items():
+        for to_node in targets:
+            if scc_id[from_node] == scc_id[to_node]:
+                circular_deps.add((from_node, to_node))
     
     return circular_deps
 
 def analyze_namespace_dependencies():
     """Analyze namespace-level dependencies with detailed information"""
-    script_path = Path("Assets/Scripts")
+    script_path = "Assets/Scripts"
     dependencies = {}
     dependency_details = {}  # namespace -> [(target_namespace, [file_paths])]
     
@@ -105,27 +405,16 @@ def analyze_namespace_dependencies():
     # First pass: collect all using statements with file locations
     namespace_usings = defaultdict(lambda: defaultdict(list))  # namespace -> target_namespace -> [file_paths]
     
-    for cs_file in script_path.rglob("*.cs"):
-        with open(cs_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Extract namespace
-        namespace_match = re.search(r'^namespace\s+([\w.]+)', content, re.MULTILINE)
-        if not namespace_match:
+    for src in _load_sources(script_path, with_content=False):
+        namespace = src.namespace
+        if not namespace:
             continue
-            
-        namespace = namespace_match.group(1)
         
-        # Extract using statements with line numbers
-        lines = content.split('\n')
-        for line_num, line in enumerate(lines, 1):
-            using_match = re.match(r'^\s*using\s+([\w.]+);', line.strip())
-            if using_match:
-                target_namespace = using_match.group(1)
-                if (not target_namespace.startswith(('System', 'Unity', 'UnityEngine'))
-                    and target_namespace != namespace):
-                    relative_path = str(cs_file.relative_to(Path("Assets/Scripts")))
-                    namespace_usings[namespace][target_namespace].append(f"{relative_path}:{line_num}")
+        # Using statements with line numbers
+        for target_namespace, line_num in src.usings:
+            if (not target_namespace.startswith(('System', 'Unity', 'UnityEngine'))
+                and target_namespace != namespace):
+                namespace_usings[namespace][target_namespace].append(f"{src.relative_path}:{line_num}")
     
     # Build dependencies and details
     for namespace, targets in namespace_usings.items():
@@ -137,120 +426,116 @@ def analyze_namespace_dependencies():
 
 def analyze_class_dependencies():
     """Analyze class-level dependencies with detailed information"""
-    script_path = Path("Assets/Scripts")
+    script_path = "Assets/Scripts"
     dependencies = {}
     dependency_details = {}  # class -> [(target_class, [reasons])]
     all_classes = {}  # class_name -> (namespace, full_name)
+    file_to_classes = defaultdict(dict)  # relative_path -> {class_name: None}, in declaration order
     
     print("Analyzing Unity class dependencies...")
     
+    sources = _load_sources(script_path)
+    
     # First pass: collect all classes
-    for cs_file in script_path.rglob("*.cs"):
-        with open(cs_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Extract namespace
-        namespace_match = re.search(r'^namespace\s+([\w.]+)', content, re.MULTILINE)
-        namespace = namespace_match.group(1) if namespace_match else "Global"
-        
-        # Extract class names (more comprehensive patterns)
-        class_patterns = [
-            r'(?:public|internal|private)?\s*(?:static\s+)?(?:partial\s+)?(?:abstract\s+)?class\s+(\w+)',
-            r'(?:public|internal|private)?\s*(?:static\s+)?(?:partial\s+)?(?:sealed\s+)?class\s+(\w+)',
-            r'(?:public|internal|private)?\s*struct\s+(\w+)',
-            r'(?:public|internal|private)?\s*(?:static\s+)?(?:partial\s+)?(?:abstract\s+)?(?:sealed\s+)?class\s+(\w+)'
-        ]
+    for src in sources:
+        namespace = src.namespace or "Global"
         
         # Simple approach: identify classes/structs that appear to be nested
         # by checking indentation and context
-        lines = content.split('\n')
+        lines = src.lines
         nested_classes = set()
         
+        # brace_prefix[i] is the net brace depth before line i, so the balance of
+        # lines j..i-1 is brace_prefix[i] - brace_prefix[j]
+        brace_prefix = [0] * (len(lines) + 1)
+        for i, line in enumerate(lines):
+            brace_prefix[i + 1] = brace_prefix[i] + line.count('{') - line.count('}')
+        
         for i, line in enumerate(lines):
             stripped = line.strip()
             if not stripped or stripped.startswith('//'):
                 continue
                 
             # Check for class/struct definitions
-            for pattern in class_patterns:
-                match = re.search(pattern, stripped)
-                if match:
-                    class_name = match.group(1)
-                    
-                    # Check if this appears to be nested by looking at preceding context
-                    is_nested = False
-                    
-                    # Look backwards for an enclosing class/struct
-                    for j in range(i-1, max(0, i-50), -1):  # Look back up to 50 lines
-                        prev_line = lines[j].strip()
-                        if not prev_line or prev_line.startswith('//'):
-                            continue
-                            
-                        # If we find another class/struct declaration and there's no closing brace
-                        # between current line and that declaration, we're nested
-                        if re.search(r'\b(?:class|struct)\s+\w+', prev_line):
-                            # Count braces between the previous class and current line
-                            brace_balance = 0
-                            for k in range(j, i):
-                                line_to_check = lines[k]
-                                brace_balance += line_to_check.count('{') - line_to_check.count('}')
-                            
-                            # If brace_balance > 0, we're still inside the previous class/struct
-                            if brace_balance > 0:
-                                is_nested = True
-                                nested_classes.add(class_name)
-                                break
-                            else:
-                                break  # We found a closed class, so we're not nested
-                    
-                    # Only add non-nested classes
-                    if not is_nested:
-                        full_class_name = f"{namespace}.{class_name}"
-                        all_classes[class_name] = (namespace, full_class_name)
-                    break
+            match = _CLASS_OR_STRUCT_RE.search(stripped)
+            if match:
+                class_name = match.group(1)
+                
+                # Check if this appears to be nested by looking at preceding context
+                is_nested = False
+                
+                # Look backwards for an enclosing class/struct
+                for j in range(i-1, max(0, i-50), -1):  # Look back up to 50 lines
+                    prev_line = lines[j].strip()
+                    if not prev_line or prev_line.startswith('//'):
+                        continue
+                        
+                    # If we find another class/struct declaration and there's no closing brace
+                    # between current line and that declaration, we're nested
+                    if _ENCLOSING_DECL_RE.search(prev_line):
+                        # Count braces between the previous class and current line
+                        brace_balance = brace_prefix[i] - brace_prefix[j]
+                        
+                        # If brace_balance > 0, we're still inside the previous class/struct
+                        if brace_balance > 0:
+                            is_nested = True
+                            nested_classes.add(class_name)
+                            break
+                        else:
+                            break  # We found a closed class, so we're not nested
+                
+                # Only add non-nested classes
+                if not is_nested:
+                    full_class_name = f"{namespace}.{class_name}"
+                    all_classes[class_name] = (namespace, full_class_name)
+                    file_to_classes[src.relative_path][class_name] = None
+    
+    # One name lookup over every class, queried once per class scope
+    find_class_names = _build_name_finder(all_classes)
+    class_order = {name: i for i, name in enumerate(all_classes)}
     
     # Second pass: find dependencies with detailed reasons
-    for cs_file in script_path.rglob("*.cs"):
-        with open(cs_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Extract namespace
-        namespace_match = re.search(r'^namespace\s+([\w.]+)', content, re.MULTILINE)
-        namespace = namespace_match.group(1) if namespace_match else "Global"
-        
-        # Extract using statements
-        using_matches = re.findall(r'^using\s+([\w.]+);', content, re.MULTILINE)
-        custom_usings = [u for u in using_matches
-                        if not u.startswith(('System', 'Unity', 'UnityEngine'))]
+    for src in sources:
+        namespace = src.namespace or "Global"
+        custom_usings = src.custom_usings
         
         # Find all classes in this file
         current_file_classes = []
-        for class_name, (class_namespace, full_name) in all_classes.items():
+        for class_name in file_to_classes.get(src.relative_path, ()):
+            class_namespace, full_name = all_classes[class_name]
             if class_namespace == namespace:
-                # Check if this class is actually defined in this file
-                if re.search(rf'(?:class|struct)\s+{re.escape(class_name)}', content):
-                    current_file_classes.append((class_name, full_name))
+                current_file_classes.append((class_name, full_name))
+        current_file_class_names = {name for name, _ in current_file_classes}
+        
+        # Extract the specific scope/body of each class to avoid cross-contamination
+        class_ranges = _build_class_ranges(src.lines)
+        scopes = {}
+        for name, _ in current_file_classes:
+            if name in class_ranges:
+                first, last = class_ranges[name]
+                scopes[name] = (first + 1, '\n'.join(src.lines[first:last + 1]))
+            else:
+                scopes[name] = (1, "")  # Class not found
         
         # For each class in this file, find its dependencies with reasons
         for class_name, full_class_name in current_file_classes:
-            class_deps = []
-            class_dep_details = defaultdict(list)  # target_class -> [reasons]
-            
-            lines = content.split('\n')
-            
-            # Extract the specific scope/body of this class to avoid cross-contamination
-            class_scope_lines = extract_class_scope(lines, class_name)
+            class_deps = set()
+            class_dep_details = defaultdict(set)  # target_class -> {reasons}
+            scope_first_line, class_scope = scopes[class_name]
             
-            # Look for references to other classes
-            for other_class_name, (other_namespace, other_full_name) in all_classes.items():
+            # Look for references to other classes. Every usage pattern contains the
+            # class name itself, so only names occurring in this scope can match
+            referenced = sorted(find_class_names(class_scope), key=class_order.__getitem__)
+            for other_class_name in referenced:
+                other_namespace, other_full_name = all_classes[other_class_name]
                 if other_full_name == full_class_name:
                     continue  # Skip self-reference
                 
                 # Skip other classes in the same file to avoid false positives from co-location
                 other_short_name = other_class_name.split('.')[-1] if '.' in other_class_name else other_class_name
-                if other_short_name in [c[0] for c in current_file_classes] and other_full_name != full_class_name:
+                if other_short_name in current_file_class_names and other_full_name != full_class_name:
                     # Check if this is a legitimate usage (not just co-location)
-                    if not has_legitimate_class_usage(class_scope_lines, other_short_name):
+                    if not has_legitimate_class_usage(class_scope, other_short_name):
                         continue
                 
                 # Check namespace availability
@@ -259,57 +544,34 @@ def analyze_class_dependencies():
                        other_namespace == "Global"):
                     continue
                 
-                # Define patterns with their descriptions
-                class_usage_patterns = [
-                    (rf':\s*{re.escape(other_class_name)}', "inheritance"),
-                    (rf':\s*.*,\s*{re.escape(other_class_name)}', "interface implementation"),
-                    (rf'(?:public|private|protected|internal)\s+{re.escape(other_class_name)}\s+\w+', "field declaration"),
-                    (rf'(?:public|private|protected|internal)\s+.*{re.escape(other_class_name)}\s+\w+', "field declaration"),
-                    (rf'<{re.escape(other_class_name)}>', "generic type parameter"),
-                    (rf'RefRW<{re.escape(other_class_name)}>', "ECS component reference (RefRW)"),
-                    (rf'RefRO<{re.escape(other_class_name)}>', "ECS component reference (RefRO)"),
-                    (rf'SystemAPI\..*<.*{re.escape(other_class_name)}.*>', "SystemAPI call"),
-                    (rf'new\s+{re.escape(other_class_name)}\s*[\(\{{]', "object instantiation"),
-                    (rf'{re.escape(other_class_name)}\.\w+', "static member access"),
-                    (rf'GetComponent<{re.escape(other_class_name)}>', "GetComponent call"),
-                    (rf'HasComponent<{re.escape(other_class_name)}>', "HasComponent call"),
-                    (rf'AddComponent\([^,]*,\s*new\s+{re.escape(other_class_name)}(?!\w)\s*\(', "AddComponent call"),
-                    (rf'typeof\({re.escape(other_class_name)}\)', "typeof reference"),
-                    (rf'\[UpdateBefore\(typeof\({re.escape(other_class_name)}\)\)\]', "UpdateBefore dependency"),
-                    (rf'\[UpdateAfter\(typeof\({re.escape(other_class_name)}\)\)\]', "UpdateAfter dependency"),
-                    (rf'UpdateBefore.*{re.escape(other_class_name)}', "UpdateBefore dependency"),
-                    (rf'UpdateAfter.*{re.escape(other_class_name)}', "UpdateAfter dependency"),
-                    (rf'\b{re.escape(other_class_name)}\b.*\s+\w+\s*[\(;]', "method parameter/variable"),
-                    (rf'\b{re.escape(other_class_name)}\b', "general reference"),
-                ]
+                class_usage_patterns = _compiled_patterns_for(other_class_name)
                 
                 found_references = False
                 # Only search within the specific class scope, not the entire file
-                for line_idx, line_content in class_scope_lines:
-                    for pattern, description in class_usage_patterns:
-                        if re.search(pattern, line_content):
-                            relative_path = str(cs_file.relative_to(Path("Assets/Scripts")))
-                            reason = f"{description} ({relative_path}:{line_idx})"
-                            class_dep_details[other_full_name].append(reason)
-                            found_references = True
-                            break
+                for line_idx, description in _match_lines_containing(class_usage_patterns, class_scope,
+                                                                     other_class_name, scope_first_line):
+                    reason = f"{description} ({src.relative_path}:{line_idx})"
+                    class_dep_details[other_full_name].add(reason)
+                    found_references = True
                 
                 if found_references:
-                    class_deps.append(other_full_name)
+                    class_deps.add(other_full_name)
             
             if class_deps:
-                dependencies[full_class_name] = list(set(class_deps))
-                dependency_details[full_class_name] = [(target, list(set(reasons)))
+                dependencies[full_class_name] = list(class_deps)
+                dependency_details[full_class_name] = [(target, list(reasons))
                                                       for target, reasons in class_dep_details.items()]
     
     return dependencies, all_classes, dependency_details
 
 def generate_dot_content(dependencies, circular_deps, diagram_type, dependency_details=None):
     """Generate DOT format content with color coding and descriptions"""
-    dot_content = "digraph Dependencies {\n"
-    dot_content += "  rankdir=TB;\n"
-    dot_content += "  node [shape=box, style=filled];\n"
-    dot_content += "  edge [fontsize=8];\n\n"
+    parts = [
+        "digraph Dependencies {\n",
+        "  rankdir=TB;\n",
+        "  node [shape=box, style=filled];\n",
+        "  edge [fontsize=8];\n\n",
+    ]
     
     # Find all nodes involved in circular dependencies
     circular_nodes = set()
@@ -326,9 +588,12 @@ def generate_dot_content(dependencies, circular_deps, diagram_type, dependency_d
         color = "lightcoral" if node in circular_nodes else "lightgreen"
         # Escape node names that might contain special characters
         escaped_node = node.replace('"', '\\"')
-        dot_content += f'  "{escaped_node}" [fillcolor={color}];\n'
+        parts.append(f'  "{escaped_node}" [fillcolor={color}];\n')
     
-    dot_content += "\n"
+    parts.append("\n")
+    
+    # Index reasons by (source, target) so each edge label is a direct lookup
+    details_map = {src: dict(pairs) for src, pairs in (dependency_details or {}).items()}
     
     # Add edges with color coding and labels
     for from_ns, to_list in dependencies.items():
@@ -339,29 +604,27 @@ def generate_dot_content(dependencies, circular_deps, diagram_type, dependency_d
             
             # Add dependency description as edge label ONLY for circular (red) dependencies
             label = ""
-            if edge_color == "red" and dependency_details and from_ns in dependency_details:
-                for target, reasons in dependency_details[from_ns]:
-                    if target == to_ns:
-                        # Truncate long reason lists for readability
-                        if len(reasons) <= 2:
-                            label = "\\n".join(reasons[:2])
-                        else:
-                            label = f"{reasons[0]}\\n...and {len(reasons)-1} more"
-                        # Escape special characters in labels
-                        label = label.replace('"', '\\"').replace('\n', '\\n')
-                        break
+            reasons = details_map.get(from_ns, {}).get(to_ns) if edge_color == "red" else None
+            if reasons is not None:
+                # Truncate long reason lists for readability
+                if len(reasons) <= 2:
+                    label = "\\n".join(reasons[:2])
+                else:
+                    label = f"{reasons[0]}\\n...and {len(reasons)-1} more"
+                # Escape special characters in labels
+                label = label.replace('"', '\\"').replace('\n', '\\n')
             
             if label:
-                dot_content += f'  "{escaped_from}" -> "{escaped_to}" [color={edge_color}, label="{label}"];\n'
+                parts.append(f'  "{escaped_from}" -> "{escaped_to}" [color={edge_color}, label="{label}"];\n')
             else:
-                dot_content += f'  "{escaped_from}" -> "{escaped_to}" [color={edge_color}];\n'
+                parts.append(f'  "{escaped_from}" -> "{escaped_to}" [color={edge_color}];\n')
     
-    dot_content += "}"
-    return dot_content
+    parts.append("}")
+    return "".join(parts)
 
 def analyze_systems_only():
     """Analyze only System classes (business logic) with detailed information"""
-    script_path = Path("Assets/Scripts")
+    script_path = "Assets/Scripts"
     dependencies = {}
     dependency_details = {}  # system -> [(target_system, [reasons])]
     all_systems = set()
@@ -371,57 +634,48 @@ def analyze_systems_only():
     # Find all System classes
     system_classes = {}
     
-    for cs_file in script_path.rglob("*.cs"):
-        with open(cs_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Extract namespace
-        namespace_match = re.search(r'^namespace\s+([\w.]+)', content, re.MULTILINE)
-        namespace = namespace_match.group(1) if namespace_match else "Global"
+    sources = _load_sources(script_path)
+    
+    for src in sources:
+        namespace = src.namespace or "Global"
+        content = src.content
         
         # Find System classes (classes ending with "System" or implementing ISystem)
-        system_patterns = [
-            r'(?:public|internal|private)?\s*(?:partial\s+)?(?:struct|class)\s+(\w*System\w*)(?:\s*:|\s+implements|\s*{)',
-            r'(?:public|internal|private)?\s*(?:partial\s+)?(?:struct|class)\s+(\w+)\s*:\s*.*ISystem',
-            r'(?:public|internal|private)?\s*(?:partial\s+)?struct\s+(\w+)\s*:\s*.*ISystem'
-        ]
-        
-        for pattern in system_patterns:
-            matches = re.findall(pattern, content)
-            for class_name in matches:
+        for pattern in _SYSTEM_DECL_PATTERNS:
+            for class_name in pattern.findall(content):
                 if class_name and not class_name.endswith(('Authoring', 'Baker', 'Data')):
                     full_name = f"{namespace}.{class_name}"
                     system_classes[class_name] = (namespace, full_name)
                     all_systems.add(full_name)  # Track all systems
     
+    # One name lookup over every system, queried once per file
+    find_system_names = _build_name_finder(system_classes)
+    system_order = {name: i for i, name in enumerate(system_classes)}
+    
     # Find dependencies between systems with detailed reasons
-    for cs_file in script_path.rglob("*.cs"):
-        with open(cs_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Extract namespace
-        namespace_match = re.search(r'^namespace\s+([\w.]+)', content, re.MULTILINE)
-        namespace = namespace_match.group(1) if namespace_match else "Global"
+    for src in sources:
+        namespace = src.namespace or "Global"
+        content = src.content
+        custom_usings = src.custom_usings
         
-        # Extract using statements
-        using_matches = re.findall(r'^using\s+([\w.]+);', content, re.MULTILINE)
-        custom_usings = [u for u in using_matches
-                        if not u.startswith(('System', 'Unity', 'UnityEngine'))]
+        # Every usage pattern contains the system name itself, so only names
+        # occurring in this file can be declared or referenced here
+        referenced = sorted(find_system_names(content), key=system_order.__getitem__)
         
         # Check if this file contains any system classes
         current_systems = []
-        for system_name, (sys_namespace, full_name) in system_classes.items():
+        for system_name in referenced:
+            sys_namespace, full_name = system_classes[system_name]
             if sys_namespace == namespace and re.search(rf'(?:struct|class)\s+{re.escape(system_name)}', content):
                 current_systems.append((system_name, full_name))
         
         # For each system in this file, find dependencies on other systems with reasons
         for system_name, full_system_name in current_systems:
-            system_deps = []
-            system_dep_details = defaultdict(list)
+            system_deps = set()
+            system_dep_details = defaultdict(set)
             
-            lines = content.split('\n')
-            
-            for other_system_name, (other_namespace, other_full_name) in system_classes.items():
+            for other_system_name in referenced:
+                other_namespace, other_full_name = system_classes[other_system_name]
                 if other_full_name == full_system_name:
                     continue
                 
@@ -431,36 +685,22 @@ def analyze_systems_only():
                        other_namespace == "Global"):
                     continue
                 
-                # Define patterns with descriptions for system dependencies
-                system_usage_patterns = [
-                    (rf'\[UpdateBefore\(typeof\({re.escape(other_system_name)}\)\)\]', "UpdateBefore dependency"),
-                    (rf'\[UpdateAfter\(typeof\({re.escape(other_system_name)}\)\)\]', "UpdateAfter dependency"),
-                    (rf'UpdateBefore.*{re.escape(other_system_name)}', "UpdateBefore dependency"),
-                    (rf'UpdateAfter.*{re.escape(other_system_name)}', "UpdateAfter dependency"),
-                    (rf'SystemAPI\.GetSingleton<{re.escape(other_system_name)}>', "SystemAPI singleton access"),
-                    (rf'World\.GetOrCreateSystem<{re.escape(other_system_name)}>', "system reference"),
-                    (rf'typeof\({re.escape(other_system_name)}\)', "typeof reference"),
-                    (rf'\b{re.escape(other_system_name)}\b.*\s+\w+\s*[;=]', "variable/field reference"),
-                    (rf'\b{re.escape(other_system_name)}\b', "general reference"),
-                ]
+                system_usage_patterns = _compiled_patterns_for(other_system_name, SYSTEM_PATTERN_TEMPLATES)
                 
                 found_references = False
-                for line_num, line in enumerate(lines, 1):
-                    for pattern, description in system_usage_patterns:
-                        if re.search(pattern, line):
-                            relative_path = str(cs_file.relative_to(Path("Assets/Scripts")))
-                            reason = f"{description} ({relative_path}:{line_num})"
-                            system_dep_details[other_full_name].append(reason)
-                            found_references = True
-                            break
+                for line_num, description in _match_lines_containing(system_usage_patterns, content,
+                                                                     other_system_name):
+                    reason = f"{description} ({src.relative_path}:{line_num})"
+                    system_dep_details[other_full_name].add(reason)
+                    found_references = True
                 
                 if found_references:
-                    system_deps.append(other_full_name)
+                    system_deps.add(other_full_name)
             
             # Always add the system to dependencies, even if it has no deps
-            dependencies[full_system_name] = list(set(system_deps)) if system_deps else []
+            dependencies[full_system_name] = list(system_deps)
             if system_deps:
-                dependency_details[full_system_name] = [(target, list(set(reasons)))
+                dependency_details[full_system_name] = [(target, list(reasons))
                                                        for target, reasons in system_dep_details.items()]
     
     # Add any remaining systems that weren't processed (standalone systems)
@@ -472,63 +712,51 @@ def analyze_systems_only():
 
 
 
-def extract_class_scope(lines, class_name):
-    """Extract the lines that belong to a specific class/struct scope"""
-    class_scope_lines = []
-    class_pattern = rf'(?:class|struct)\s+{re.escape(class_name)}(?:\s*:|<|\s+|\s*{{)'
+def _build_class_ranges(lines):
+    """Map every class/struct name in a file to the (first, last) line indexes of its scope
+    
+    A scope starts at the first line containing '{' at or after the name's first
+    declaration and ends on the line where the brace depth drops back to where
+    it was before that declaration (or at the end of the file).
+    """
+    ranges = {}
+    seen = set()
+    open_scopes = []  # [name, depth before declaration, first scope line or None]
+    depth = 0
     
-    # Find the class definition line
-    class_start_line = None
     for i, line in enumerate(lines):
-        if re.search(class_pattern, line):
-            class_start_line = i
-            break
-    
-    if class_start_line is None:
-        return class_scope_lines  # Class not found
-    
-    # Find the matching closing brace for this class
-    brace_count = 0
-    in_class = False
-    
-    for i in range(class_start_line, len(lines)):
-        line = lines[i]
-        
-        # Start counting braces when we encounter the opening brace
-        if '{' in line:
-            brace_count += line.count('{')
-            in_class = True
+        if 'class' in line or 'struct' in line:
+            for match in _SCOPE_DECL_RE.finditer(line):
+                name = match.group(1)
+                if name not in seen:
+                    seen.add(name)
+                    open_scopes.append([name, depth, None])
         
-        if in_class:
-            class_scope_lines.append((i + 1, line))  # Store with 1-based line number
+        opens = line.count('{')
+        depth += opens - line.count('}')
         
-        if '}' in line:
-            brace_count -= line.count('}')
-            
-        # When brace count returns to 0, we've found the end of the class
-        if in_class and brace_count <= 0:
-            break
+        if open_scopes:
+            still_open = []
+            for scope in open_scopes:
+                if scope[2] is None and opens:
+                    scope[2] = i
+                if scope[2] is not None and depth <= scope[1]:
+                    ranges[scope[0]] = (scope[2], i)
+                else:
+                    still_open.append(scope)
+            open_scopes = still_open
+    
+    # Scopes left unclosed run to the end of the file
+    for name, _, first in open_scopes:
+        if first is not None:
+            ranges[name] = (first, len(lines) - 1)
     
-    return class_scope_lines
+    return ranges
 
-def has_legitimate_class_usage(class_scope_lines, other_class_name):
+def has_legitimate_class_usage(class_scope, other_class_name):
     """Check if there's a legitimate usage of another class within this class scope"""
-    legitimate_patterns = [
-        rf'new\s+{re.escape(other_class_name)}\s*[\(\{{]',  # object instantiation
-        rf':\s*{re.escape(other_class_name)}',  # inheritance
-        rf'<{re.escape(other_class_name)}>',  # generic parameter
-        rf'AddComponent\([^,]*,\s*new\s+{re.escape(other_class_name)}',  # AddComponent
-        rf'typeof\({re.escape(other_class_name)}\)',  # typeof reference
-        rf'(?:public|private|protected|internal)\s+{re.escape(other_class_name)}\s+\w+',  # field declaration
-        rf'{re.escape(other_class_name)}\.\w+',  # static member access
-    ]
-    
-    for line_idx, line_content in class_scope_lines:
-        for pattern in legitimate_patterns:
-            if re.search(pattern, line_content.strip()):
-                return True
-    
-    return False
+    legitimate_patterns = _compiled_patterns_for(other_class_name, LEGITIMATE_USAGE_TEMPLATES)
+    return any(_match_lines_containing(legitimate_patterns, class_scope, other_class_name))
 
 def main():
     print("Unity Dependency Analyzer")
@@ -598,18 +826,19 @@ def main():
             circular_nodes.add(from_node)
             circular_nodes.add(to_node)
         
+        details_map = {src: dict(pairs) for src, pairs in dependency_details.items()}
+        
         # Show detailed reasons only for circular dependency edges
         for from_item, to_item in circular_deps:
             print(f"\n🔴 CIRCULAR: {from_item} → {to_item}")
             
             # Find and display the specific reasons for this circular edge
-            if from_item in dependency_details:
-                for target, reasons in dependency_details[from_item]:
-                    if target == to_item:
-                        print(f"  Dependency created by:")
-                        for reason in reasons:
-                            print(f"    • {reason}")
-                        break
+            if from_item in details_map:
+                reasons = details_map[from_item].get(to_item)
+                if reasons is not None:
+                    print(f"  Dependency created by:")
+                    for reason in reasons:
+                        print(f"    • {reason}")
                 else:
                     print(f"  (No detailed reason found - may be indirect dependency)")
     